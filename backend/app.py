@@ -5,11 +5,56 @@ Localhost-only, single endpoint for README generation
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from docgen_agent import DocGenAgent
-from typing import List
+from models import ProjectAnalysis, ReadmeResponse
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import time
 import uvicorn
 
+class InProcessQueueHandler(QueueHandler):
+    """
+    Queue records as-is. The stock prepare() formats the record (and its
+    traceback) on the calling thread so it can be pickled; the listener
+    runs in this process, so formatting is left to its handler thread.
+    """
+    def prepare(self, record):
+        return record
+
+def configure_logging():
+    """
+    Route all logging through a queue so handler I/O happens on a
+    background thread instead of the event loop
+
+    Idempotent: uvicorn's spawned workers run this module both as
+    __mp_main__ and as "app", and both share the root logger.
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, QueueHandler) for h in root.handlers):
+        return
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root.addHandler(InProcessQueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    listener.start()
+    atexit.register(listener.stop)
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="GodForge README Agent", version="1.0.0")
 
 # CORS middleware
@@ -21,27 +66,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+class RemoteGZipMiddleware(GZipMiddleware):
+    """
+    GZip for remote clients only
+
+    Loopback clients (the VS Code extension) gain nothing from compression,
+    and streamed READMEs are left alone so gzip buffering doesn't hold
+    back chunks.
+    """
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            client = scope.get("client")
+            if (client and client[0] in LOOPBACK_HOSTS) or scope["path"].endswith("/stream"):
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+# Compress README responses (negotiated via Accept-Encoding)
+app.add_middleware(RemoteGZipMiddleware, minimum_size=1024)
+
 # Initialize agent
 agent = DocGenAgent()
 
-# Request/Response models
-class ProjectAnalysis(BaseModel):
-    name: str
-    structure: List[str]
-    languages: List[str]
-    frameworks: List[str]
-    fileCount: int
-    estimatedLOC: int
-    apiKey: str | None = None
-    description: str | None = None
-    dependencies: dict | None = None
-    scripts: dict | None = None
-
-class ReadmeResponse(BaseModel):
-    readme: str
+# Generated READMEs keyed by analysis fingerprint (LRU, in-memory).
+# Entries expire so an unchanged project still gets a fresh README later.
+README_CACHE_SIZE = 128
+README_CACHE_TTL_SECONDS = 600
+readme_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+def analysis_fingerprint(analysis: ProjectAnalysis) -> str:
+    """
+    Hash a normalized analysis so identical projects share a cache entry
+
+    The structure is hashed in the order it arrives: it is an indented
+    tree, so reordering lines would lose which directory a file is in.
+    """
+    normalized = analysis.model_dump(exclude={'apiKey'})
+    normalized['languages'] = sorted(l.lower() for l in analysis.languages)
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def cached_readme(fingerprint: str) -> str | None:
+    """Return a cached README that hasn't expired"""
+    entry = readme_cache.get(fingerprint)
+    if entry is None:
+        return None
+    stored_at, readme_content = entry
+    if time.monotonic() - stored_at > README_CACHE_TTL_SECONDS:
+        del readme_cache[fingerprint]
+        return None
+    readme_cache.move_to_end(fingerprint)
+    return readme_content
+
+def cache_readme(fingerprint: str, readme_content: str):
+    """Store a generated README, evicting the least recently used"""
+    readme_cache[fingerprint] = (time.monotonic(), readme_content)
+    readme_cache.move_to_end(fingerprint)
+    if len(readme_cache) > README_CACHE_SIZE:
+        readme_cache.popitem(last=False)
 
 @app.post('/generate-readme', response_model=ReadmeResponse)
-async def generate_readme(analysis: ProjectAnalysis):
+async def generate_readme(analysis: ProjectAnalysis, no_cache: bool = False):
     """
     Generate README from project analysis
     
@@ -55,30 +142,79 @@ async def generate_readme(analysis: ProjectAnalysis):
         "estimatedLOC": 1260
     }
     
+    Query params:
+        no_cache=1 bypasses the README cache and forces regeneration
+    
     Response:
     {
         "readme": "# Project Name\n\n..."
     }
     """
     try:
-        print(f"📥 Received request for project: {analysis.name}")
+        logger.info("📥 Received request for project: %s", analysis.name)
         
-        # Convert Pydantic model to dict for agent
-        analysis_dict = analysis.model_dump()
+        fingerprint = analysis_fingerprint(analysis)
+        cached = None if no_cache else cached_readme(fingerprint)
+        if cached is not None:
+            logger.info("⚡ Serving README from cache")
+            return ReadmeResponse(readme=cached)
         
         # Generate README via agent
-        readme_content = agent.generate(analysis_dict, analysis.apiKey)
+        readme_content = await agent.generate(analysis, analysis.apiKey)
         
-        print(f"✅ README generated successfully ({len(readme_content)} chars)")
+        cache_readme(fingerprint, readme_content)
+        
+        logger.info("✅ README generated successfully (%d chars)", len(readme_content))
         
         return ReadmeResponse(readme=readme_content)
         
-    except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"❌ ERROR generating README:")
-        print(error_details)
-        raise HTTPException(status_code=500, detail=str(e))
+    except Exception:
+        # The traceback is formatted on the logging thread (see
+        # InProcessQueueHandler); clients only get a generic 500
+        logger.exception("❌ README generation failed")
+        raise HTTPException(status_code=500, detail="internal error")
+
+@app.post('/generate-readme/stream')
+async def generate_readme_stream(analysis: ProjectAnalysis, no_cache: bool = False):
+    """
+    Stream README markdown as plain text while it is generated
+    
+    Same request body and query params as /generate-readme. The response
+    body is raw markdown (text/plain), sent chunk by chunk.
+    """
+    media_type = "text/plain; charset=utf-8"
+
+    try:
+        logger.info("📥 Received streaming request for project: %s", analysis.name)
+        
+        fingerprint = analysis_fingerprint(analysis)
+        cached = None if no_cache else cached_readme(fingerprint)
+        if cached is not None:
+            logger.info("⚡ Serving README from cache")
+            return StreamingResponse(iter([cached.encode()]), media_type=media_type)
+        
+        # Wait for the first chunk so setup/API errors still map to a 500
+        chunks = agent.stream(analysis, analysis.apiKey)
+        first_chunk = await anext(chunks, None)
+        if first_chunk is None:
+            raise ValueError("Empty response from Gemini")
+        
+    except Exception:
+        logger.exception("❌ README generation failed")
+        raise HTTPException(status_code=500, detail="internal error")
+
+    async def body():
+        parts = [first_chunk]
+        yield first_chunk.encode()
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk.encode()
+        
+        readme_content = "".join(parts).strip()
+        cache_readme(fingerprint, readme_content)
+        logger.info("✅ README streamed successfully (%d chars)", len(readme_content))
+
+    return StreamingResponse(body(), media_type=media_type)
 
 @app.get('/health')
 async def health():
@@ -86,7 +222,21 @@ async def health():
     return {"status": "ok"}
 
 if __name__ == '__main__':
-    print("🚀 GodForge Backend (FastAPI) starting on http://localhost:5000")
-    print("📝 Endpoint: POST /generate-readme")
-    print("📚 API Docs: http://localhost:5000/docs")
-    uvicorn.run(app, host="127.0.0.1", port=5000, log_level="info")
+    # Load .env once in the parent; spawned workers inherit os.environ
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    
+    logger.info("🚀 GodForge Backend (FastAPI) starting on http://localhost:5000")
+    logger.info("📝 Endpoints: POST /generate-readme, POST /generate-readme/stream")
+    logger.info("📚 API Docs: http://localhost:5000/docs")
+    uvicorn.run(
+        "app:app",
+        host="127.0.0.1",
+        port=5000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+        # "auto" picks uvloop when installed (it has no Windows build)
+        loop="auto",
+        http="httptools",
+        log_level="info",
+    )
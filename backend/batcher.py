@@ -0,0 +1,192 @@
+"""
+Prompt Batcher - Coalesce concurrent README prompts into one Gemini call
+
+Prompts for the same API key that arrive within a short window are sent
+as a single multi-project prompt and the JSON answer is split back out
+to each caller. A batch only grows while the members' output budgets fit
+in one call's output limit; a prompt whose budget leaves no room for
+another is sent on its own without waiting. A batch that comes back
+malformed is retried as individual calls, so batching never costs a
+caller its README. API errors (rate limits, timeouts) are passed to
+every caller in the batch rather than multiplied into more calls.
+"""
+
+import asyncio
+import json
+import logging
+from typing import List, Optional, Set, Tuple, Union
+
+from gemini_client import MAX_OUTPUT_TOKENS, GeminiClient
+
+BATCH_WINDOW_SECONDS = 0.05
+MAX_BATCH_SIZE = 4
+
+logger = logging.getLogger(__name__)
+
+
+class PromptBatcher:
+    def __init__(self, gemini: GeminiClient, batch_gemini: GeminiClient,
+                 window: float = BATCH_WINDOW_SECONDS,
+                 max_batch: int = MAX_BATCH_SIZE,
+                 min_budget: int = 1):
+        """
+        Args:
+            gemini: Client for single prompts (markdown output)
+            batch_gemini: Client whose system instruction asks for a
+                JSON array of READMEs
+            min_budget: Smallest output budget any prompt can have
+        """
+        self._gemini = gemini
+        self._batch_gemini = batch_gemini
+        self._min_budget = min_budget
+        self._window = window
+        self._max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Strong references so in-flight dispatches aren't garbage collected
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str, max_tokens: int = MAX_OUTPUT_TOKENS) -> str:
+        """
+        Queue a prompt and wait for its generated README
+        """
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._drain())
+
+        future = loop.create_future()
+        await self._queue.put((prompt, max_tokens, future))
+        return await future
+
+    def close(self):
+        """
+        Stop collecting batches. Prompts already queued are still
+        dispatched, individually, so no caller is left waiting.
+        """
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+
+    async def _drain(self):
+        """Collect batches from the queue and dispatch them"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        # A prompt that didn't fit the previous batch's budget opens the next
+        carry = None
+
+        try:
+            while True:
+                if carry is None:
+                    batch = [await self._queue.get()]
+                    deadline = loop.time() + self._window
+                else:
+                    # A carried prompt already sat out one window; it only
+                    # picks up prompts that are queued right now
+                    batch, carry = [carry], None
+                    deadline = loop.time()
+                budget = batch[0][1]
+
+                # No other prompt could fit alongside this one
+                if budget + self._min_budget > MAX_OUTPUT_TOKENS:
+                    self._start_dispatch(batch)
+                    batch = []
+                    continue
+
+                while len(batch) < self._max_batch:
+                    if not self._queue.empty():
+                        item = self._queue.get_nowait()
+                    else:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(self._queue.get(), remaining)
+                        except asyncio.TimeoutError:
+                            break
+                    if budget + item[1] > MAX_OUTPUT_TOKENS:
+                        carry = item
+                        break
+                    batch.append(item)
+                    budget += item[1]
+
+                # Dispatch in the background so the next window opens immediately
+                self._start_dispatch(batch)
+                batch = []
+
+        except asyncio.CancelledError:
+            if carry is not None:
+                batch.append(carry)
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for item in batch:
+                self._start_dispatch([item])
+            raise
+
+    def _start_dispatch(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        prompts = [(prompt, max_tokens) for prompt, max_tokens, _ in batch]
+
+        if len(batch) == 1:
+            results = await self._generate_each(prompts)
+        else:
+            results = await self._generate_batch(prompts)
+
+        # Each caller gets its own README or its own error
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _generate_each(self, prompts: List[Tuple[str, int]]) -> List[Union[str, BaseException]]:
+        return list(await asyncio.gather(
+            *(self._gemini.generate_content_async(prompt, max_tokens=budget)
+              for prompt, budget in prompts),
+            return_exceptions=True,
+        ))
+
+    async def _generate_batch(self, prompts: List[Tuple[str, int]]) -> List[Union[str, BaseException]]:
+        """
+        Generate several READMEs with one call, falling back to
+        individual calls if the combined answer can't be split
+        """
+        sections = "\n\n".join(
+            f"=== PROJECT {index} ===\n{prompt}"
+            for index, (prompt, _) in enumerate(prompts)
+        )
+        # _drain only groups prompts whose budgets fit in one call, so
+        # the sum is within MAX_OUTPUT_TOKENS and is used as-is
+        max_tokens = sum(budget for _, budget in prompts)
+        combined = (
+            f"Generate READMEs for the following {len(prompts)} projects.\n"
+            f"Output a JSON array of exactly {len(prompts)} strings, where "
+            f"element i is the complete README markdown for PROJECT i.\n\n"
+            f"{sections}"
+        )
+
+        try:
+            text = await self._batch_gemini.generate_content_async(
+                combined, json_output=True, max_tokens=max_tokens,
+            )
+        except Exception as e:
+            # The call itself already retried; splitting it would only
+            # multiply requests against the same rate limit
+            return [e] * len(prompts)
+
+        try:
+            readmes = json.loads(text)
+        except ValueError:
+            readmes = None
+
+        if (isinstance(readmes, list) and len(readmes) == len(prompts)
+                and all(isinstance(r, str) and r.strip() for r in readmes)):
+            return [r.strip() for r in readmes]
+
+        logger.warning("⚠️ Batched response malformed, retrying individually")
+        return await self._generate_each(prompts)
@@ -7,74 +7,22 @@ Responsibilities:
 3. Return markdown string
 
 NO file system access
-NO state management
+NO state management (beyond reusing Gemini clients and batchers per API key)
 Pure function: analysis → README
 """
 
-from gemini_client import GeminiClient
+from batcher import PromptBatcher
+from gemini_client import MAX_OUTPUT_TOKENS, GeminiClient, hash_api_key
+from models import AnalysisView, ProjectAnalysis
+from collections import Counter, OrderedDict, defaultdict
+from string import Template
+from typing import AsyncIterator, List
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
-
-class DocGenAgent:
-    def __init__(self):
-        pass
-    
-    def generate(self, analysis: dict, api_key: str = None) -> str:
-        """
-        Generate README from project analysis
-        
-        Args:
-            analysis: ProjectAnalysis dict from TypeScript
-            api_key: Gemini API Key provided by user
-        
-        Returns:
-            Markdown string
-        """
-        # Fallback to env var if not provided (though frontend should provide it)
-        key_to_use = api_key or os.getenv('GEMINI_API_KEY')
-        
-        if not key_to_use:
-             raise ValueError(
-                "GEMINI_API_KEY not provided.\n"
-                "Please configure it in the VS Code extension."
-            )
-
-        # Initialize client per request with specific key
-        gemini = GeminiClient(key_to_use)
-
-        prompt = self._build_prompt(analysis)
-        readme = gemini.generate_content(prompt)
-        return readme
-    
-    def _build_prompt(self, analysis: dict) -> str:
-        """
-        Build STRICT, STRUCTURED prompt for professional README generation
-        
-        Philosophy:
-        - Explicit constraints
-        - No hallucination
-        - Professional tone
-        - Comprehensive but focused
-        """
-        
-        structure_preview = "\n".join(analysis.get('structure', [])[:40])
-        languages = ", ".join(analysis.get('languages', []))
-        frameworks = ", ".join(analysis.get('frameworks', []))
-        
-        prompt = f"""You are a senior technical writer and developer advocate. Generate a comprehensive, professional README.md file that follows GitHub best practices.
-
-PROJECT ANALYSIS:
-- Name: {analysis.get('name', 'Unknown')}
-- Primary Languages: {languages or 'Not detected'}
-- Frameworks/Tools: {frameworks or 'Not detected'}
-- Total Files: {analysis.get('fileCount', 0)}
-- Estimated Lines of Code: {analysis.get('estimatedLOC', 0)}
-
-PROJECT STRUCTURE:
-{structure_preview}
+# Static instructions shared by every request. Sent as the model's
+# system instruction so only the per-project analysis travels in each
+# prompt.
+_README_RULES = """You are a senior technical writer and developer advocate. Generate a comprehensive, professional README.md file that follows GitHub best practices.
 
 REQUIREMENTS FOR THE README:
 
@@ -139,12 +87,228 @@ CRITICAL RULES:
 - DO write in present tense
 - DO be specific and actionable
 
-OUTPUT FORMAT:
+"""
+
+STATIC_PREFIX = _README_RULES + """OUTPUT FORMAT:
 Generate ONLY the markdown content. Do not wrap in ```markdown blocks.
 Start directly with the # title.
 
-IMPORTANT: You MUST generate the COMPLETE README covering ALL sections from 1 to 10. Do not stop early. Ensure the response is complete.
+IMPORTANT: You MUST generate the COMPLETE README covering ALL sections from 1 to 10. Do not stop early. Ensure the response is complete."""
+
+# Same rules for batched calls, which carry several projects and must
+# answer with a JSON array instead of bare markdown
+BATCH_PREFIX = _README_RULES + """OUTPUT FORMAT:
+The prompt contains several projects, each introduced by "=== PROJECT i ===".
+Respond with ONLY a JSON array of strings, one per project, in order.
+Element i is the markdown README for PROJECT i, starting directly with its # title (not wrapped in ```markdown blocks).
+
+IMPORTANT: Every README MUST cover ALL sections from 1 to 10. Do not stop early. Ensure the response is complete."""
+
+# Per-project part of the prompt, parsed once at import
+_PROMPT_TEMPLATE = Template("""PROJECT ANALYSIS:
+- Name: $name
+- Primary Languages: $languages
+- Frameworks/Tools: $frameworks
+- Total Files: $file_count
+- Estimated Lines of Code: $estimated_loc
+
+PROJECT STRUCTURE:
+$structure_preview
+
+FILE TYPES: $file_types
+
+Generate the README now:""")
+
+# Clients/batchers kept per API key (LRU, in-memory)
+MAX_CLIENTS = 32
+
+# Output token budget: enough for every section of a small project,
+# growing with the size of the file listing
+MIN_OUTPUT_TOKENS = 2048
+TOKENS_PER_STRUCTURE_ENTRY = 48
+
+# Structures longer than this are summarized per directory
+STRUCTURE_RAW_LIMIT = 20
+
+
+def _summarize_structure(structure: List[str]) -> tuple[str, str]:
+    """
+    Compress a file listing into per-directory summaries
+
+    Accepts both the extension's indented tree ("  📁 src/", "    📄 a.ts")
+    and plain paths ("src/a.ts"). Root files are kept by name since config
+    files carry the most signal; deeper directories are collapsed to a
+    file count and their extensions.
+
+    Returns:
+        (structure preview, file-type histogram)
+    """
+    dir_exts: dict[str, Counter] = defaultdict(Counter)
+    root_files: List[str] = []
+    ext_counts: Counter = Counter()
+    stack: List[str] = []
+
+    for entry in structure:
+        stripped = entry.lstrip(' ')
+        depth = (len(entry) - len(stripped)) // 2
+        is_dir = stripped.startswith('📁') or stripped.endswith('/')
+        name = stripped.removeprefix('📁').removeprefix('📄').strip().rstrip('/')
+        if not name:
+            continue
+
+        del stack[depth:]
+        path = "/".join(stack + [name])
+
+        if is_dir:
+            stack.append(name)
+            dir_exts[path + "/"]
+            continue
+
+        parent, _, filename = path.rpartition('/')
+        ext = os.path.splitext(filename)[1] or filename
+        ext_counts[ext] += 1
+        if parent:
+            dir_exts[parent + "/"][ext] += 1
+        else:
+            root_files.append(filename)
+
+    histogram = ", ".join(f"{ext} ({count})" for ext, count in ext_counts.most_common())
+
+    if len(structure) <= STRUCTURE_RAW_LIMIT:
+        return "\n".join(structure), histogram
 
-Generate the README now:"""
+    lines = list(root_files)
+    for directory, exts in dir_exts.items():
+        total = sum(exts.values())
+        if total:
+            lines.append(f"{directory} ({total} files: {', '.join(exts)})")
+        else:
+            lines.append(directory)
+
+    return "\n".join(lines), histogram
+
+
+class DocGenAgent:
+    def __init__(self):
+        self._clients: "OrderedDict[str, GeminiClient]" = OrderedDict()
+        self._batchers: "OrderedDict[str, PromptBatcher]" = OrderedDict()
+    
+    async def generate(self, analysis: ProjectAnalysis, api_key: str = None) -> str:
+        """
+        Generate README from project analysis
+        
+        Args:
+            analysis: ProjectAnalysis sent by the extension
+            api_key: Gemini API Key provided by user
+        
+        Returns:
+            Markdown string
+        """
+        key_hash = self._ensure_client(api_key)
+        view = AnalysisView.from_analysis(analysis)
+        prompt = self._build_prompt(view)
+
+        # Requests for the same key arriving together share one call
+        readme = await self._batchers[key_hash].submit(
+            prompt, max_tokens=self._output_budget(view),
+        )
+        return readme
+    
+    def stream(self, analysis: ProjectAnalysis, api_key: str = None) -> AsyncIterator[str]:
+        """
+        Stream README markdown chunks as Gemini generates them
+        
+        Streams bypass batching, since a batched answer can only be split
+        once it is complete. Key/client errors raise here, before the
+        first chunk is requested.
+        
+        Args:
+            analysis: ProjectAnalysis sent by the extension
+            api_key: Gemini API Key provided by user
+        
+        Returns:
+            Async iterator of markdown chunks
+        """
+        key_hash = self._ensure_client(api_key)
+        view = AnalysisView.from_analysis(analysis)
+        prompt = self._build_prompt(view)
+        return self._clients[key_hash].stream_content_async(
+            prompt, max_tokens=self._output_budget(view),
+        )
+    
+    def _ensure_client(self, api_key: str = None) -> str:
+        """
+        Create (once) the client and batcher for an API key, evicting
+        the least recently used key beyond MAX_CLIENTS
+        
+        Returns:
+            Hash of the key used to look them up
+        """
+        # Fallback to env var if not provided (though frontend should provide it)
+        key_to_use = api_key or os.getenv('GEMINI_API_KEY')
+        
+        if not key_to_use:
+             raise ValueError(
+                "GEMINI_API_KEY not provided.\n"
+                "Please configure it in the VS Code extension."
+            )
+
+        key_hash = hash_api_key(key_to_use)
+
+        # Reuse the configured client for this key across requests
+        if key_hash in self._clients:
+            self._clients.move_to_end(key_hash)
+            self._batchers.move_to_end(key_hash)
+            return key_hash
+
+        gemini = GeminiClient(key_to_use, system_instruction=STATIC_PREFIX)
+        self._clients[key_hash] = gemini
+        self._batchers[key_hash] = PromptBatcher(
+            gemini, GeminiClient(key_to_use, system_instruction=BATCH_PREFIX),
+            min_budget=MIN_OUTPUT_TOKENS,
+        )
+
+        if len(self._clients) > MAX_CLIENTS:
+            self._clients.popitem(last=False)
+            _, batcher = self._batchers.popitem(last=False)
+            batcher.close()
+
+        return key_hash
+    
+    def _output_budget(self, view: AnalysisView) -> int:
+        """
+        Output tokens dominate generation time, so small projects get a
+        smaller budget, never more than one call can produce
+        """
+        budget = MIN_OUTPUT_TOKENS + TOKENS_PER_STRUCTURE_ENTRY * len(view.structure)
+        return min(budget, MAX_OUTPUT_TOKENS)
+    
+    def _build_prompt(self, view: AnalysisView) -> str:
+        """
+        Build STRICT, STRUCTURED prompt for professional README generation
+        
+        Only the per-project analysis is built here; the shared
+        instructions live in STATIC_PREFIX.
+        
+        Philosophy:
+        - Explicit constraints
+        - No hallucination
+        - Professional tone
+        - Comprehensive but focused
+        """
+        
+        structure_preview, file_types = _summarize_structure(view.structure)
+        languages = ", ".join(view.languages)
+        frameworks = ", ".join(view.frameworks)
+        
+        prompt = _PROMPT_TEMPLATE.substitute(
+            name=view.name or 'Unknown',
+            languages=languages or 'Not detected',
+            frameworks=frameworks or 'Not detected',
+            file_count=view.file_count,
+            estimated_loc=view.estimated_loc,
+            structure_preview=structure_preview,
+            file_types=file_types or 'Not detected',
+        )
         
         return prompt
@@ -2,61 +2,165 @@
 Gemini API Client - Wrapper for Google Generative AI
 
 Handles:
-- Model selection
+- Model selection (GEMINI_MODEL, discovery cached per API key)
+- Static system instruction
 - Timeout configuration
+- Concurrency limiting and rate-limit backoff
 - Error handling
-- Response parsing
+- Response parsing (buffered or streamed)
 """
 
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+
 import google.generativeai as genai
-from typing import Optional
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-1.5-flash-latest"
+DISCOVERY_TIMEOUT_SECONDS = 10
+
+# Bounds in-flight Gemini calls per worker so bursts queue here instead of
+# tripping the API's rate limit
+_gemini_sem: Optional[asyncio.Semaphore] = None
+
+
+def _gemini_semaphore() -> asyncio.Semaphore:
+    """
+    Created on first use rather than at import, so GEMINI_MAX_INFLIGHT
+    set in .env (loaded after this module is imported) is honoured
+    """
+    global _gemini_sem
+    if _gemini_sem is None:
+        _gemini_sem = asyncio.Semaphore(int(os.getenv("GEMINI_MAX_INFLIGHT", "8")))
+    return _gemini_sem
+
+
+def hash_api_key(api_key: str) -> str:
+    """Stable, non-reversible key for per-API-key caches"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_model(api_key_hash: str, api_key: str) -> str:
+    """
+    Discover the first model supporting generateContent for an API key
+
+    Cached per key hash so discovery (a blocking network round-trip)
+    only happens once per key for the lifetime of the process. Uses its
+    own client rather than the global genai config, so it is safe to run
+    in a worker thread.
+    """
+    client = glm.ModelServiceClient(client_options={'api_key': api_key})
+
+    available_models = list(genai.list_models(
+        client=client,
+        request_options={'timeout': DISCOVERY_TIMEOUT_SECONDS},
+    ))
+
+    # Filter for models that support generateContent
+    content_models = [
+        m for m in available_models
+        if 'generateContent' in m.supported_generation_methods
+    ]
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📋 Found %d models that support generateContent:", len(content_models))
+        for m in content_models:
+            logger.debug("   - %s", m.name)
+
+    if not content_models:
+        raise ValueError("No models available that support generateContent")
+
+    # Use the first available model
+    selected_model = content_models[0]
+    logger.info("🎯 Using model: %s", selected_model.name)
+
+    return selected_model.name
+
+
+# Two models per key (single and batched system instructions), for as
+# many keys as DocGenAgent keeps clients
+@functools.lru_cache(maxsize=64)
+def _get_model(api_key_hash: str, model_name: str,
+               system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+    """
+    Build a GenerativeModel once per key and model
+
+    A model binds the configured API key's client (and its connection) on
+    its first call, so reusing the instance reuses that connection. The
+    key hash keeps models for different keys apart.
+    """
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+
+MAX_OUTPUT_TOKENS = 8192
+
 
 class GeminiClient:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        
-        print("🔍 Listing all available models for your API key...")
-        
+    _configured_key_hash: Optional[str] = None
+
+    def __init__(self, api_key: str, system_instruction: Optional[str] = None):
+        self._api_key = api_key
+        self._key_hash = hash_api_key(api_key)
+
         try:
-            # List all available models
-            available_models = list(genai.list_models())
-            
-            print(f"📋 Found {len(available_models)} total models")
-            
-            # Filter for models that support generateContent
-            content_models = [
-                m for m in available_models 
-                if 'generateContent' in m.supported_generation_methods
-            ]
-            
-            print(f"✅ Found {len(content_models)} models that support generateContent:")
-            for m in content_models:
-                print(f"   - {m.name}")
-            
-            if not content_models:
-                print("❌ No models support generateContent!")
-                print("📋 All available models:")
-                for m in available_models:
-                    print(f"   - {m.name}: {m.supported_generation_methods}")
-                raise ValueError("No models available that support generateContent")
-            
-            # Use the first available model
-            selected_model = content_models[0]
-            print(f"\n🎯 Using model: {selected_model.name}")
-            
-            self.model = genai.GenerativeModel(selected_model.name)
-            
+            # Skip discovery unless GEMINI_MODEL is explicitly blanked out;
+            # it still runs if the configured model turns out not to exist.
+            # Either way it happens on the first call, off the event loop.
+            self._model_name = os.getenv("GEMINI_MODEL", DEFAULT_MODEL)
+            self._discovered = False
+            self._system_instruction = system_instruction
+            self.model = None
+            if self._model_name:
+                self._build_model()
+
         except Exception as e:
-            print(f"❌ Error during model initialization: {e}")
+            logger.error("❌ Error during model initialization: %s", e)
             raise
     
-    def generate_content(self, prompt: str, timeout: int = 60) -> str:
+    def _build_model(self):
+        """
+        Build the model with the static system instruction. The shared
+        prefix comes first in every request, which is what Gemini's
+        implicit caching keys on; it is far below the minimum size for
+        an explicit context cache.
+        """
+        self.model = _get_model(self._key_hash, self._model_name, self._system_instruction)
+
+    async def _discover_model(self):
+        """
+        Fall back to the first generateContent model the key can use.
+        list_models blocks, so discovery runs in a worker thread.
         """
-        Generate content from prompt
+        self._model_name = await asyncio.to_thread(_resolve_model, self._key_hash, self._api_key)
+        self._discovered = True
+        self._build_model()
+
+    def _ensure_configured(self):
+        """genai is configured globally; only reconfigure on key change"""
+        if GeminiClient._configured_key_hash != self._key_hash:
+            genai.configure(api_key=self._api_key)
+            GeminiClient._configured_key_hash = self._key_hash
+
+    async def generate_content_async(self, prompt: str, timeout: int = 60,
+                                     json_output: bool = False,
+                                     max_tokens: int = MAX_OUTPUT_TOKENS) -> str:
+        """
+        Generate content from prompt without blocking the event loop
         
         Args:
             prompt: Structured prompt string
             timeout: Max seconds to wait
+            json_output: Ask the model for a JSON response
+            max_tokens: Output token budget
         
         Returns:
             Generated text
@@ -65,15 +169,12 @@ class GeminiClient:
             Exception on API errors
         """
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    'temperature': 0.7,
-                    'top_p': 0.9,
-                    'top_k': 40,
-                    'max_output_tokens': 8192,
-                }
-            )
+            generation_config = self._generation_config(max_tokens)
+            if json_output:
+                generation_config['response_mime_type'] = 'application/json'
+
+            async with _gemini_semaphore():
+                response = await self._generate(prompt, generation_config, timeout)
             
             if not response or not response.text:
                 raise ValueError("Empty response from Gemini")
@@ -82,3 +183,70 @@ class GeminiClient:
             
         except Exception as e:
             raise Exception(f"Gemini API error: {str(e)}")
+
+    async def stream_content_async(self, prompt: str, timeout: int = 60,
+                                   max_tokens: int = MAX_OUTPUT_TOKENS) -> AsyncIterator[str]:
+        """
+        Generate content from prompt, yielding text chunks as they arrive
+        
+        Args:
+            prompt: Structured prompt string
+            timeout: Max seconds to wait
+            max_tokens: Output token budget
+        
+        Yields:
+            Generated text chunks
+        
+        Raises:
+            Exception on API errors
+        """
+        try:
+            # The slot is held for the whole stream, which is one API call
+            async with _gemini_semaphore():
+                response = await self._generate(prompt, self._generation_config(max_tokens), timeout, stream=True)
+                async for chunk in response:
+                    if chunk.parts:
+                        yield chunk.text
+        except Exception as e:
+            raise Exception(f"Gemini API error: {str(e)}")
+
+    def _generation_config(self, max_tokens: int) -> dict:
+        return {
+            'temperature': 0.7,
+            'top_p': 0.9,
+            'top_k': 40,
+            'max_output_tokens': min(max_tokens, MAX_OUTPUT_TOKENS),
+        }
+
+    @retry(
+        retry=retry_if_exception_type(google_exceptions.ResourceExhausted),
+        wait=wait_exponential(multiplier=1, min=1, max=20),
+        stop=stop_after_attempt(5),
+        reraise=True,
+    )
+    async def _generate(self, prompt: str, generation_config: dict, timeout: int,
+                        stream: bool = False):
+        if self.model is None:
+            await self._discover_model()
+
+        try:
+            return await self._call_model(prompt, generation_config, timeout, stream)
+        except google_exceptions.NotFound:
+            if self._discovered:
+                raise
+            logger.warning("⚠️ Model %s not found, discovering available models", self._model_name)
+            await self._discover_model()
+            return await self._call_model(prompt, generation_config, timeout, stream)
+
+    async def _call_model(self, prompt: str, generation_config: dict, timeout: int,
+                          stream: bool):
+        # The model binds the globally configured key when the call is
+        # issued; there is no await between configuring and calling, so
+        # concurrent requests for other keys cannot interleave
+        self._ensure_configured()
+        return await self.model.generate_content_async(
+            prompt,
+            generation_config=generation_config,
+            request_options={'timeout': timeout},
+            stream=stream,
+        )
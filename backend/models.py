@@ -0,0 +1,53 @@
+"""
+Request/Response models shared by the API and the agent
+"""
+
+from dataclasses import dataclass
+from pydantic import BaseModel, conlist
+from typing import List
+
+# Oversized listings are rejected during validation instead of being
+# walked in full; the extension itself sends at most 80 entries
+MAX_STRUCTURE_ENTRIES = 2000
+
+
+class ProjectAnalysis(BaseModel):
+    name: str
+    structure: conlist(str, max_length=MAX_STRUCTURE_ENTRIES)
+    languages: List[str]
+    frameworks: List[str]
+    fileCount: int
+    estimatedLOC: int
+    apiKey: str | None = None
+    description: str | None = None
+    dependencies: dict | None = None
+    scripts: dict | None = None
+
+
+class ReadmeResponse(BaseModel):
+    readme: str
+
+
+@dataclass(slots=True)
+class AnalysisView:
+    """
+    The fields the agent reads from a ProjectAnalysis, copied once
+    into a slotted object for plain attribute access
+    """
+    name: str
+    structure: List[str]
+    languages: List[str]
+    frameworks: List[str]
+    file_count: int
+    estimated_loc: int
+
+    @classmethod
+    def from_analysis(cls, analysis: ProjectAnalysis) -> "AnalysisView":
+        return cls(
+            name=analysis.name,
+            structure=analysis.structure,
+            languages=analysis.languages,
+            frameworks=analysis.frameworks,
+            file_count=analysis.fileCount,
+            estimated_loc=analysis.estimatedLOC,
+        )
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { StringDecoder } from 'string_decoder';
 import { ProjectAnalysis } from './analyzer';
 
 /**
@@ -13,7 +14,17 @@ const BACKEND_URL = 'http://localhost:5000';
 const TIMEOUT_MS = 60000; // 60 seconds
 const MAX_RETRIES = 2;
 
-export async function generateReadme(analysis: ProjectAnalysis, apiKey: string): Promise<string> {
+/**
+ * Stream README markdown from the backend as it is generated.
+ * `onChunk` receives the full text accumulated so far after every chunk.
+ * `noCache` asks the backend to regenerate instead of serving a cached README.
+ */
+export async function streamReadme(
+    analysis: ProjectAnalysis,
+    apiKey: string,
+    onChunk: (partial: string) => void,
+    noCache: boolean = false
+): Promise<string> {
     let lastError: any;
 
     // Inject API Key
@@ -22,19 +33,29 @@ export async function generateReadme(analysis: ProjectAnalysis, apiKey: string):
     for (let attempt = 1; attempt <= MAX_RETRIES; attempt++) {
         try {
             const response = await axios.post(
-                `${BACKEND_URL}/generate-readme`,
+                `${BACKEND_URL}/generate-readme/stream`,
                 analysis,
                 {
                     timeout: TIMEOUT_MS,
-                    headers: { 'Content-Type': 'application/json' }
+                    headers: { 'Content-Type': 'application/json' },
+                    params: noCache ? { no_cache: 1 } : undefined,
+                    responseType: 'stream'
                 }
             );
 
-            if (response.data && response.data.readme) {
-                return response.data.readme;
-            } else {
+            // Decode incrementally so multi-byte characters split across chunks survive
+            const decoder = new StringDecoder('utf8');
+            let readme = '';
+            for await (const chunk of response.data) {
+                readme += decoder.write(chunk);
+                onChunk(readme);
+            }
+            readme += decoder.end();
+
+            if (!readme.trim()) {
                 throw new Error('Invalid response from backend');
             }
+            return readme.trim();
 
         } catch (error: any) {
             lastError = error;
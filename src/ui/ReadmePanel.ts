@@ -1,7 +1,7 @@
 import * as vscode from 'vscode';
 import { analyzeProject } from '../services/analyzer';
 import { createSnapshot, restoreSnapshot, listSnapshots } from '../services/snapshot';
-import { generateReadme } from '../services/backend-client';
+import { streamReadme } from '../services/backend-client';
 import { PreviewContentProvider } from './PreviewContentProvider';
 
 /**
@@ -13,6 +13,8 @@ export class ReadmePanel {
     private readonly _extensionUri: vscode.Uri;
     private _disposables: vscode.Disposable[] = [];
     private _previewContent: string | null = null;
+    // Once a README was generated, clicking Generate again asks for a fresh one
+    private _hasGenerated = false;
     private _previewProvider: PreviewContentProvider;
     private _context: vscode.ExtensionContext;
 
@@ -172,7 +174,13 @@ export class ReadmePanel {
         // STEP 3-4: Generate via Backend
         this._sendMessage({ type: 'status', message: 'Generating README...' });
         try {
-            this._previewContent = await generateReadme(analysis, apiKey);
+            this._previewContent = await streamReadme(analysis, apiKey, (partial) => {
+                // Keep an open preview in sync while the README streams in
+                this._previewProvider.update(partial);
+                this._sendMessage({ type: 'progress', length: partial.length });
+            }, this._hasGenerated);
+            this._hasGenerated = true;
+            this._previewProvider.update(this._previewContent);
 
             this._sendMessage({
                 type: 'generated',
@@ -562,6 +570,8 @@ export class ReadmePanel {
                     
                     if (message.type === 'status') {
                         status.textContent = message.message;
+                    } else if (message.type === 'progress') {
+                        status.textContent = 'Generating README... (' + message.length + ' chars)';
                     } else if (message.type === 'generated') {
                         status.textContent = '✅ README generated! Click Preview to review.';
                     } else if (message.type === 'error') {